@@ -1,9 +1,16 @@
 import streamlit as st
-import pandas as pd
+import io
+import hashlib
 import random
 import os
+import tempfile
 import datetime
-from typing import List, Dict, Any, Optional, Set
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
+
+# pandas (and numpy) are imported inside the functions that use them, so opening
+# the app does not pay their import cost until a file or the results are needed
+if TYPE_CHECKING:
+    import pandas as pd
 
 # --- Constants ---
 # We will now use an uploaded file, so this is just a reference for expected structure
@@ -18,12 +25,73 @@ COL_IDX_OPTION_C = 3
 COL_IDX_OPTION_D = 4
 COL_IDX_CORRECT_ANSWER_LETTER = 5
 
+CSV_CHUNK_SIZE = 50_000 # Rows parsed per chunk when reading uploaded CSV files
+PARSED_CACHE_DIR = ".cache" # Parquet copies of already-parsed quiz files, keyed by content hash
+PARSED_CACHE_SCHEMA_VERSION = 1 # Bump when the sidecar columns change so old files are ignored
+PARSED_CACHE_MAX_FILES = 32 # Sidecars kept on disk; the least recently written are deleted
+PARSED_QUIZ_CACHE_ENTRIES = 8 # Parsed uploads kept in memory; older ones are evicted
+
+# Reasons a row of an uploaded file is skipped, used in the aggregated warning
+SKIP_INVALID_LETTER = "an invalid correct answer letter"
+SKIP_EMPTY_QUESTION = "empty question text"
+MAX_LISTED_SKIPPED_ROWS = 20 # Row numbers listed per reason before truncating
+
+# Sidebar instructions, written as static HTML so st.html can render them
+# without the markdown parse on every rerun
+INSTRUCTIONS_HTML = """
+<p><strong>Welcome to the Multiple Choice Quiz App!</strong></p>
+<ol>
+  <li><strong>Enter Your Name:</strong> Enter your name under "User" above. This is needed to save your quiz results.</li>
+  <li><strong>Upload Your Quiz File:</strong>
+    <ul>
+      <li>Under "Load Quiz File" below, click "Browse files".</li>
+      <li>Select a <strong>CSV</strong> or <strong>XLSX</strong> (Excel) file.</li>
+      <li><strong>File Structure (by column position):</strong>
+        <ul>
+          <li>Your file <strong>must</strong> contain at least 6 columns.</li>
+          <li>The <strong>1st column</strong> should contain the <strong>Question</strong> text.</li>
+          <li>The <strong>2nd, 3rd, 4th, and 5th columns</strong> should contain the text for <strong>Option A, B, C, and D</strong> respectively.</li>
+          <li>The <strong>6th column</strong> should contain the <strong>Correct Answer Letter</strong> ('A', 'B', 'C', or 'D'). Quotation marks around the letter are ignored.</li>
+          <li>The <strong>very first row</strong> of your file should contain <strong>headers</strong> (these are ignored, only the position matters).</li>
+          <li>Any columns beyond the 6th will be ignored.</li>
+        </ul>
+      </li>
+    </ul>
+  </li>
+  <li><strong>Start the Quiz:</strong> Once the quiz file is loaded, click the "<strong>🚀 Start Quiz</strong>" button in the main area (right side).</li>
+  <li><strong>Answer Questions:</strong>
+    <ul>
+      <li>Read the question displayed in the main area.</li>
+      <li>Select your answer from the multiple-choice options.</li>
+      <li>Click "<strong>✅ Submit Answer</strong>". You'll get immediate feedback (Correct/Incorrect).</li>
+      <li><em>(Optional)</em>: Click "<strong>💡 Show Answer</strong>" if you're stuck (this will mark the question as incorrect if you haven't submitted yet).</li>
+    </ul>
+  </li>
+  <li><strong>Continue:</strong> After submitting or showing the answer, the main button changes to "<strong>➡️ Next Question</strong>". Click it to proceed.</li>
+  <li><strong>Restarting:</strong>
+    <ul>
+      <li><strong>During Quiz:</strong> Use the "<strong>🔁 Restart Quiz Now</strong>" button under "Quiz Controls" below to start over with the same quiz questions at any time.</li>
+      <li><strong>After Quiz:</strong> Once finished, a "<strong>Restart Quiz</strong>" button appears below the results in the main area.</li>
+    </ul>
+  </li>
+  <li><strong>View Results:</strong>
+    <ul>
+      <li>Your final score and a review of incorrect/correct answers appear automatically when the quiz ends in the main area.</li>
+      <li>To see a history of all past attempts, click "<strong>Show All Past Results</strong>" under "History" below.</li>
+    </ul>
+  </li>
+</ol>
+<p><strong>Good luck!</strong> ✨</p>
+"""
+
 # Session State Keys
 SS_QUIZ_DATA = 'quiz_data_uploaded_mc'
 SS_USER = 'user_uploaded_mc'
-SS_CURRENT_INDEX = 'current_card_index_uploaded_mc'  # Store the index being displayed
 SS_FLASHCARDS = 'flashcards_uploaded_mc' # Store the parsed quiz data
 SS_LOADED_FILE_NAME = '_loaded_file_name_uploaded_mc' # Track the name of the loaded file
+SS_LOADED_FILE_DIGEST = '_loaded_file_digest_uploaded_mc' # Content hash of the loaded file
+SS_LOADED_FILE_ID = '_loaded_file_id_uploaded_mc' # Uploader file_id the stored digest belongs to
+SS_LOAD_WARNING = '_load_warning_uploaded_mc' # Skipped-rows warning for the loaded file, if any
 
 # Quiz Data Keys (within session_state[SS_QUIZ_DATA])
 QK_STARTED = 'quiz_started'
@@ -37,9 +105,12 @@ QK_USER_SELECTED_OPTION = 'user_selected_option' # Stores the user's selected op
 QK_SUBMITTED = 'submitted'  # Boolean flag for current question submission
 QK_SHOW_ANSWER_CLICKED = 'show_answer_clicked'  # Boolean flag for current q
 QK_USED_QUESTIONS = 'used_questions'  # Set of original indices attempted
-# Stores options for the currently displayed question (list of strings like 'A: Text')
-QK_CURRENT_OPTIONS_DISPLAY = 'current_options_display'
+# Shuffled list of flashcard indices not yet completed; the last one is the current question
+QK_AVAILABLE = 'available'
 QK_LAST_ANSWER_CORRECT = 'last_answer_correct' # Added: Store if the last submitted answer was correct
+QK_INCORRECT_DF = 'incorrect_df' # DataFrame of incorrect questions, built once when the quiz ends
+QK_SUMMARY_ROW = 'summary_row' # Results file row for the finished quiz, built once at completion
+QK_FULL_RERUN_PENDING = 'full_rerun_pending' # Set when the quiz panel must rerun the whole app
 
 
 # --- Helper Functions ---
@@ -58,12 +129,246 @@ def _get_default_quiz_state() -> Dict[str, Any]:
         # Flag indicating if 'Show Answer' was clicked for the current question
         QK_SHOW_ANSWER_CLICKED: False,
         QK_USED_QUESTIONS: set(),   # Set of original flashcard indices already presented
-        QK_CURRENT_OPTIONS_DISPLAY: None, # Options generated for the current question (for display)
+        QK_AVAILABLE: [],           # Remaining question indices, filled in by start_quiz
         QK_LAST_ANSWER_CORRECT: None, # Added: Initialize correctness state
     }
 
 # --- Core Logic Functions ---
 
+class QuizFileFormatError(ValueError):
+    """Raised when an uploaded quiz file cannot be turned into quiz questions."""
+
+    def __init__(self, message: str, info: Optional[str] = None):
+        super().__init__(message)
+        self.info = info  # Optional extra guidance shown with st.info
+
+
+def _check_column_count(n_cols: int):
+    """Raises QuizFileFormatError if the file has fewer than the 6 expected columns."""
+    if n_cols < 6:
+        raise QuizFileFormatError(
+            f"Uploaded file must contain at least 6 columns. "
+            f"Detected {n_cols} columns.",
+            info="Expected column structure (by position): Question (1st), Option A (2nd), Option B (3rd), Option C (4th), Option D (5th), Correct Answer Letter (6th)."
+        )
+
+
+def _make_card(original_index: int, question: str, a: str, b: str, c: str, d: str,
+               correct_letter: str) -> Dict[str, Any]:
+    """Builds a single quiz question dictionary, including its precomputed radio labels."""
+    options = {'A': a, 'B': b, 'C': c, 'D': d}
+    # Radio labels in a consistent order (A, B, C, D), built once instead of on every rerun
+    options_display = [f"{letter}: {text}" for letter, text in options.items()]
+    return {
+        'original_index': original_index, # Keep track of the original row index
+        'question': question,
+        'options': options,
+        'options_display': options_display,
+        'option_letter_by_display': dict(zip(options_display, options)), # Radio label -> letter
+        'correct_option_letter': correct_letter,
+        'correct_answer_text': options[correct_letter], # Store the text of the correct answer
+    }
+
+
+def _build_quiz_records(df: "pd.DataFrame") -> Tuple[List[Dict[str, Any]], Dict[str, List[int]]]:
+    """
+    Converts a parsed quiz DataFrame into quiz question dictionaries.
+
+    Columns are extracted and cleaned as whole arrays instead of row by row.
+
+    Args:
+        df: DataFrame with the quiz columns in their expected positions.
+
+    Returns:
+        A tuple of (quiz questions, skipped file row numbers keyed by skip reason).
+    """
+    import numpy as np
+    import pandas as pd
+    # Columns are read as strings; fillna only guards cells the reader left empty
+    cols = df.iloc[:, :6].fillna('').to_numpy()
+    questions = cols[:, COL_IDX_QUESTION]
+    opt_a = cols[:, COL_IDX_OPTION_A]
+    opt_b = cols[:, COL_IDX_OPTION_B]
+    opt_c = cols[:, COL_IDX_OPTION_C]
+    opt_d = cols[:, COL_IDX_OPTION_D]
+    # Remove surrounding whitespace, then leading/trailing single or double quotes
+    letters = pd.Series(cols[:, COL_IDX_CORRECT_ANSWER_LETTER]).str.strip().str.strip('"\'').str.upper().to_numpy()
+
+    valid_letter = np.isin(letters, ['A', 'B', 'C', 'D'])
+    has_question = (pd.Series(questions).str.strip().str.len() > 0).to_numpy()
+    valid = valid_letter & has_question
+
+    # File row numbers: +1 for the header row, +1 for 1-based numbering
+    skipped = {
+        SKIP_INVALID_LETTER: (df.index[~valid_letter] + 2).tolist(),
+        SKIP_EMPTY_QUESTION: (df.index[valid_letter & ~has_question] + 2).tolist(),
+    }
+
+    quiz_data = []
+    for i, q, a, b, c, d, letter in zip(df.index[valid], questions[valid], opt_a[valid],
+                                        opt_b[valid], opt_c[valid], opt_d[valid], letters[valid]):
+        quiz_data.append(_make_card(int(i), q, a, b, c, d, letter))
+
+    return quiz_data, skipped
+
+
+def _file_digest(data: bytes) -> str:
+    """Returns a short content hash identifying an uploaded file."""
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def _parsed_cache_path(data: bytes) -> str:
+    """Returns the Parquet sidecar path for the given uploaded file contents."""
+    return os.path.join(PARSED_CACHE_DIR, f"{_file_digest(data)}.v{PARSED_CACHE_SCHEMA_VERSION}.parquet")
+
+
+def _read_parsed_cache(path: str) -> Optional[List[Dict[str, Any]]]:
+    """Loads previously parsed quiz questions from a Parquet sidecar, or None if unavailable."""
+    import pandas as pd
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_parquet(path)
+    except Exception:
+        return None  # Unreadable sidecar or no Parquet engine; fall back to parsing
+
+    try:
+        quiz_data = []
+        for i, q, a, b, c, d, letter in zip(df['original_index'], df['question'], df['A'], df['B'],
+                                            df['C'], df['D'], df['correct_option_letter']):
+            quiz_data.append(_make_card(int(i), q, a, b, c, d, letter))
+    except (KeyError, ValueError):
+        return None  # Unexpected sidecar contents; parse again, which rewrites the sidecar
+    return quiz_data
+
+
+def _prune_parsed_cache():
+    """
+    Deletes sidecars from older schema versions and all but the newest
+    PARSED_CACHE_MAX_FILES current ones, so the cache directory stays bounded.
+    """
+    current_suffix = f".v{PARSED_CACHE_SCHEMA_VERSION}.parquet"
+    current = []
+    for entry in os.scandir(PARSED_CACHE_DIR):
+        if not entry.is_file() or not entry.name.endswith(".parquet"):
+            continue  # Skip temporary files that may still be being written
+        try:
+            if entry.name.endswith(current_suffix):
+                current.append((entry.stat().st_mtime, entry.path))
+            else:
+                os.remove(entry.path)  # Left over from an older schema version
+        except FileNotFoundError:
+            pass  # Already removed by another session
+
+    current.sort(reverse=True)
+    for _, stale_path in current[PARSED_CACHE_MAX_FILES:]:
+        try:
+            os.remove(stale_path)
+        except FileNotFoundError:
+            pass
+
+
+def _write_parsed_cache(path: str, quiz_data: List[Dict[str, Any]]):
+    """Saves parsed quiz questions to a Parquet sidecar. Failures are ignored."""
+    import pandas as pd
+    df = pd.DataFrame({
+        'original_index': [item['original_index'] for item in quiz_data],
+        'question': [item['question'] for item in quiz_data],
+        'A': [item['options']['A'] for item in quiz_data],
+        'B': [item['options']['B'] for item in quiz_data],
+        'C': [item['options']['C'] for item in quiz_data],
+        'D': [item['options']['D'] for item in quiz_data],
+        'correct_option_letter': [item['correct_option_letter'] for item in quiz_data],
+    })
+    tmp_path = None
+    try:
+        os.makedirs(PARSED_CACHE_DIR, exist_ok=True)
+        # Write to a temporary file and move it into place, so other sessions
+        # never read a partially written sidecar
+        fd, tmp_path = tempfile.mkstemp(dir=PARSED_CACHE_DIR, suffix=".parquet.tmp")
+        os.close(fd)
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        _prune_parsed_cache()
+    except Exception:
+        # The sidecar is only an optimization
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@st.cache_data(show_spinner=False, max_entries=PARSED_QUIZ_CACHE_ENTRIES)
+def _parse_quiz_bytes(data: bytes, name: str) -> Tuple[List[Dict[str, Any]], Dict[str, List[int]]]:
+    """
+    Parses the raw bytes of an uploaded quiz file into quiz questions.
+
+    Cached on the file contents so reruns with the same upload skip parsing.
+    Successfully parsed files are also saved as a Parquet sidecar, so the same
+    file uploaded after an app restart skips CSV/Excel parsing as well.
+    Errors are raised (and therefore never cached) rather than reported here.
+
+    Args:
+        data: The raw bytes of the uploaded file.
+        name: The uploaded file name, used to pick the reader.
+
+    Returns:
+        A tuple of (quiz questions, skipped file row numbers keyed by skip reason).
+
+    Raises:
+        QuizFileFormatError: If the file format or structure is not usable.
+    """
+    import pandas as pd
+    cache_path = _parsed_cache_path(data)
+    cached = _read_parsed_cache(cache_path)
+    if cached is not None:
+        return cached, {}
+
+    quiz_data = []
+    skipped: Dict[str, List[int]] = {}
+    total_rows = 0
+
+    if name.endswith('.csv'):
+        # Peek at the header and first row so empty or narrow files get a clear error
+        # instead of a usecols failure
+        head = pd.read_csv(io.BytesIO(data), nrows=1, dtype=str, keep_default_na=False)
+        if head.empty:
+            raise QuizFileFormatError(f"The file '{name}' is empty.")
+        _check_column_count(head.shape[1])
+        # Read only the quiz columns, as plain strings, without type inference or NaN conversion.
+        # Rows are streamed in chunks to bound peak memory; chunk indexes continue across
+        # chunks, so row numbers in warnings and 'original_index' stay absolute.
+        with pd.read_csv(io.BytesIO(data), usecols=range(6), dtype=str,
+                         keep_default_na=False, chunksize=CSV_CHUNK_SIZE) as reader:
+            for chunk in reader:
+                total_rows += len(chunk)
+                chunk_data, chunk_skipped = _build_quiz_records(chunk)
+                quiz_data.extend(chunk_data)
+                for reason, rows in chunk_skipped.items():
+                    skipped.setdefault(reason, []).extend(rows)
+    elif name.endswith(('.xlsx', '.xls')):
+        # Excel files cannot be read in chunks, so the sheet is loaded in one go
+        df = pd.read_excel(io.BytesIO(data), dtype=str, keep_default_na=False)
+        if df.empty:
+            raise QuizFileFormatError(f"The file '{name}' is empty.")
+        _check_column_count(df.shape[1])
+        total_rows = len(df)
+        quiz_data, skipped = _build_quiz_records(df.iloc[:, :6])
+    else:
+        raise QuizFileFormatError("Unsupported file format. Please upload a CSV or XLSX file.")
+
+    if total_rows == 0:
+        raise QuizFileFormatError(f"The file '{name}' is empty.")
+
+    if not quiz_data:
+         raise QuizFileFormatError("No valid questions found in the uploaded file.")
+
+    # The sidecar does not record skipped rows, so files with skipped rows are not
+    # persisted; loading them from the sidecar would silently drop their warning
+    if not any(skipped.values()):
+        _write_parsed_cache(cache_path, quiz_data)
+
+    return quiz_data, skipped
+
+
 def load_quiz_data_from_file(uploaded_file) -> Optional[List[Dict[str, Any]]]:
     """
     Loads quiz data from an uploaded CSV or XLSX file based on column position.
@@ -76,6 +381,12 @@ def load_quiz_data_from_file(uploaded_file) -> Optional[List[Dict[str, Any]]]:
     5th: Option D text
     6th: Correct Answer Letter (A, B, C, or D)
 
+    Parsing is delegated to the cached _parse_quiz_bytes, so re-uploading
+    identical file contents returns the already-built question list.
+
+    Skipped rows are summarized in st.session_state[SS_LOAD_WARNING] rather than
+    shown here, because main() reruns the app right after a successful load.
+
     Args:
         uploaded_file: The file object uploaded via st.file_uploader.
 
@@ -83,80 +394,40 @@ def load_quiz_data_from_file(uploaded_file) -> Optional[List[Dict[str, Any]]]:
         A list of dictionaries (quiz questions) or None if loading fails or format is incorrect.
     """
     try:
-        fname = uploaded_file.name
-        if fname.endswith('.csv'):
-            df = pd.read_csv(uploaded_file)
-        elif fname.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(uploaded_file)
-        else:
-            st.error("Unsupported file format. Please upload a CSV or XLSX file.")
-            return None
-
-        if df.empty:
-            st.error(f"The file '{fname}' is empty.")
-            return None
-
-        # Check if there are enough columns based on position
-        if df.shape[1] < 6:
-            st.error(
-                f"Uploaded file must contain at least 6 columns. "
-                f"Detected {df.shape[1]} columns."
-            )
-            st.info("Expected column structure (by position): Question (1st), Option A (2nd), Option B (3rd), Option C (4th), Option D (5th), Correct Answer Letter (6th).")
-            return None
-
-        quiz_data = []
-        # Iterate through rows, using iloc to access columns by position
-        for index, row in df.iterrows():
-            options = {
-                'A': str(row.iloc[COL_IDX_OPTION_A]),
-                'B': str(row.iloc[COL_IDX_OPTION_B]),
-                'C': str(row.iloc[COL_IDX_OPTION_C]),
-                'D': str(row.iloc[COL_IDX_OPTION_D]),
-            }
-            # --- Modified logic to handle quotation marks ---
-            correct_letter_raw = str(row.iloc[COL_IDX_CORRECT_ANSWER_LETTER]).strip()
-            # Remove leading/trailing single or double quotes
-            correct_letter = correct_letter_raw.lstrip('"\'').rstrip('"\'').upper()
-            # --- End modified logic ---
-
-            question_text = str(row.iloc[COL_IDX_QUESTION])
-
-            if correct_letter not in options:
-                 st.warning(f"Row {index + 2}: Invalid correct answer letter '{correct_letter_raw}' (parsed as '{correct_letter}'). Skipping question.")
-                 continue
-
-            # Basic check for empty question text
-            if not question_text.strip():
-                 st.warning(f"Row {index + 2}: Empty question text. Skipping question.")
-                 continue
-
-            quiz_data.append({
-                'original_index': index, # Keep track of the original row index
-                'question': question_text,
-                'options': options,
-                'correct_option_letter': correct_letter,
-                'correct_answer_text': options[correct_letter], # Store the text of the correct answer
-            })
-
-        if not quiz_data:
-             st.error("No valid questions found in the uploaded file.")
-             return None
-
-        return quiz_data
-
+        quiz_data, skipped = _parse_quiz_bytes(uploaded_file.getvalue(), uploaded_file.name)
+    except QuizFileFormatError as e:
+        st.error(str(e))
+        if e.info:
+            st.info(e.info)
+        return None
     except Exception as e:
         st.error(f"An error occurred while reading the file: {e}")
         return None
 
+    # Summarize all skipped rows in a single warning, displayed by main()
+    skipped_lines = []
+    for reason, rows in skipped.items():
+        if rows:
+            listed = ", ".join(str(row) for row in rows[:MAX_LISTED_SKIPPED_ROWS])
+            more = "..." if len(rows) > MAX_LISTED_SKIPPED_ROWS else ""
+            noun = "row" if len(rows) == 1 else "rows"
+            skipped_lines.append(f"Skipped {len(rows)} {noun} with {reason}: {noun} {listed}{more}")
+    if skipped_lines:
+        st.session_state[SS_LOAD_WARNING] = "\n\n".join(skipped_lines)
+    elif SS_LOAD_WARNING in st.session_state:
+        del st.session_state[SS_LOAD_WARNING]
+
+    return quiz_data
+
 
 def start_quiz(quiz_data: List[Dict[str, Any]]):
     """Initializes or restarts the quiz state in session_state."""
     st.session_state[SS_FLASHCARDS] = quiz_data  # Store the loaded quiz data
     st.session_state[SS_QUIZ_DATA] = _get_default_quiz_state()
-    # Clear any lingering current index from a previous run
-    if SS_CURRENT_INDEX in st.session_state:
-        del st.session_state[SS_CURRENT_INDEX]
+    # Shuffle the question order once; questions are then popped off the end one by one
+    available = list(range(len(quiz_data)))
+    random.shuffle(available)
+    st.session_state[SS_QUIZ_DATA][QK_AVAILABLE] = available
     st.rerun()  # Rerun to reflect the start of the quiz immediately
 
 
@@ -173,16 +444,7 @@ def display_question(question_data: Dict[str, Any], question_key_suffix: str):
     """
     st.write(f"**Question:** {question_data['question']}")
 
-    # Ensure options are in a consistent order (A, B, C, D) for display
-    options_display = [
-        f"A: {question_data['options']['A']}",
-        f"B: {question_data['options']['B']}",
-        f"C: {question_data['options']['C']}",
-        f"D: {question_data['options']['D']}",
-    ]
-
-    # Store options display for later use (e.g., check_answer)
-    st.session_state[SS_QUIZ_DATA][QK_CURRENT_OPTIONS_DISPLAY] = options_display
+    options_display = question_data['options_display']
 
     # Use a unique key based on the question index/suffix to maintain state correctly
     selected_option_display = st.radio(
@@ -192,12 +454,31 @@ def display_question(question_data: Dict[str, Any], question_key_suffix: str):
         index=None  # Default to no selection
     )
 
-    # Extract the option letter (A, B, C, D) from the selected string
+    # Map the selected label back to its option letter (A, B, C, D)
     if selected_option_display:
-        return selected_option_display.split(':')[0].strip()
+        return question_data['option_letter_by_display'][selected_option_display]
     return None
 
 
+def _question_key_suffix(current_card_index: int) -> str:
+    """Returns the widget key suffix used for a question's radio in the quiz panel."""
+    return f"q_{current_card_index}"
+
+
+def _selected_option_letter(current_card_index: int) -> Optional[str]:
+    """
+    Returns the option letter currently selected in a question's radio, or None.
+
+    Reads the widget value from session_state, so it is up to date inside
+    on_click callbacks, which run before the quiz panel is redrawn.
+    """
+    selected_option_display = st.session_state.get(f"radio_{_question_key_suffix(current_card_index)}")
+    if not selected_option_display:
+        return None
+    current_card = st.session_state[SS_FLASHCARDS][current_card_index]
+    return current_card['option_letter_by_display'].get(selected_option_display)
+
+
 def check_answer(user_selected_option_letter: Optional[str], correct_option_letter: str) -> bool:
     """Checks if the user's selected option letter is correct (case-insensitive comparison)."""
     if user_selected_option_letter is None:
@@ -206,29 +487,34 @@ def check_answer(user_selected_option_letter: Optional[str], correct_option_lett
 
 
 def handle_incorrect_answer(current_card: Dict[str, Any], user_selected_option_letter: Optional[str]):
-    """Handles the logic when an answer is marked incorrect."""
-    quiz_data = st.session_state[SS_QUIZ_DATA]
-    # Avoid double counting if somehow submitted again (e.g., clicking show answer after submitting)
-    if current_card['original_index'] not in quiz_data[QK_USED_QUESTIONS]:
-        quiz_data[QK_INCORRECT_COUNT] += 1
-        user_answer_text = "No answer"
-        if user_selected_option_letter and user_selected_option_letter in current_card['options']:
-             user_answer_text = current_card['options'][user_selected_option_letter]
+    """
+    Handles the logic when an answer is marked incorrect.
 
-        quiz_data[QK_INCORRECT_QUESTIONS].append({
-            'Question': current_card['question'],
-            'Correct Answer': current_card['correct_answer_text'],
-            'Your Answer': user_answer_text
-        })
+    Callers only invoke this for questions not yet in QK_USED_QUESTIONS, which
+    avoids double counting (e.g., clicking show answer after submitting).
+    """
+    quiz_data = st.session_state[SS_QUIZ_DATA]
+    quiz_data[QK_INCORRECT_COUNT] += 1
+    user_answer_text = "No answer"
+    if user_selected_option_letter and user_selected_option_letter in current_card['options']:
+         user_answer_text = current_card['options'][user_selected_option_letter]
+
+    quiz_data[QK_INCORRECT_QUESTIONS].append({
+        'Question': current_card['question'],
+        'Correct Answer': current_card['correct_answer_text'],
+        'Your Answer': user_answer_text
+    })
 
 
 def handle_submit(current_card_index: int):
-    """Handles the answer submission logic."""
+    """Handles the answer submission logic. Used as an on_click callback."""
     quiz_data = st.session_state[SS_QUIZ_DATA]
     flashcards = st.session_state[SS_FLASHCARDS]
     current_card = flashcards[current_card_index]
 
-    user_selected_option_letter = quiz_data[QK_USER_SELECTED_OPTION]
+    # Read the live radio value: a selection change in the same rerun is not yet in quiz_data
+    user_selected_option_letter = _selected_option_letter(current_card_index)
+    quiz_data[QK_USER_SELECTED_OPTION] = user_selected_option_letter
 
     is_correct = check_answer(user_selected_option_letter, current_card['correct_option_letter'])
 
@@ -236,68 +522,68 @@ def handle_submit(current_card_index: int):
     quiz_data[QK_LAST_ANSWER_CORRECT] = is_correct
     # --- End store correctness state ---
 
-    if is_correct:
-        # Avoid double counting if somehow submitted again
-        if current_card['original_index'] not in quiz_data[QK_USED_QUESTIONS]:
+    # Only count the first attempt, to avoid double counting if somehow submitted again
+    # or already recorded via "Show Answer"
+    idx = current_card['original_index']
+    if idx not in quiz_data[QK_USED_QUESTIONS]:
+        if is_correct:
             quiz_data[QK_CORRECT_COUNT] += 1
             quiz_data[QK_CORRECT_QUESTIONS].append({
                 'Question': current_card['question'],
                 'Correct Answer': current_card['correct_answer_text']
             })
-    else:
-        # Record incorrect only if not already recorded via "Show Answer"
-        if current_card['original_index'] not in quiz_data[QK_USED_QUESTIONS]:
+        else:
             handle_incorrect_answer(current_card, user_selected_option_letter)
+        quiz_data[QK_USED_QUESTIONS].add(idx)  # Mark as used
 
     quiz_data[QK_SUBMITTED] = True
     quiz_data[QK_SHOW_ANSWER] = True  # Show answer after submitting
-    quiz_data[QK_USED_QUESTIONS].add(current_card['original_index'])  # Mark as used
-    st.rerun()  # Update UI to show feedback and potentially Next button
 
 
 def handle_show_answer(current_card_index: int):
-    """Handles the logic when 'Show Answer' is clicked."""
+    """
+    Handles the logic when 'Show Answer' is clicked. Used as an on_click callback;
+    the quiz panel displays the correct answer once QK_SHOW_ANSWER is set.
+    """
     quiz_data = st.session_state[SS_QUIZ_DATA]
     flashcards = st.session_state[SS_FLASHCARDS]
     current_card = flashcards[current_card_index]
 
-    # --- Set correctness state to False if showing answer before submitting ---
-    if current_card['original_index'] not in quiz_data[QK_USED_QUESTIONS]:
-         quiz_data[QK_LAST_ANSWER_CORRECT] = False # Showing answer before submitting means it's incorrect
-    # --- End set correctness state ---
-
-    st.info(f"**Correct Answer:** {current_card['correct_answer_text']}")
     quiz_data[QK_SHOW_ANSWER] = True
     quiz_data[QK_SHOW_ANSWER_CLICKED] = True
 
-    # If the answer wasn't already submitted/used, mark it as incorrect
-    if current_card['original_index'] not in quiz_data[QK_USED_QUESTIONS]:
-        user_selected_option_letter = quiz_data[QK_USER_SELECTED_OPTION]
+    # If the answer wasn't already submitted/used, showing it counts as incorrect
+    idx = current_card['original_index']
+    if idx not in quiz_data[QK_USED_QUESTIONS]:
+        quiz_data[QK_LAST_ANSWER_CORRECT] = False # Showing answer before submitting means it's incorrect
+        user_selected_option_letter = _selected_option_letter(current_card_index)
+        quiz_data[QK_USER_SELECTED_OPTION] = user_selected_option_letter
         handle_incorrect_answer(current_card, user_selected_option_letter)
-        quiz_data[QK_USED_QUESTIONS].add(current_card['original_index'])  # Mark as used
+        quiz_data[QK_USED_QUESTIONS].add(idx)  # Mark as used
 
     # Treat showing answer as a form of submission
     quiz_data[QK_SUBMITTED] = True
-    st.rerun()  # Update UI
 
 
 def handle_next_question():
-    """Resets flags to prepare for the next question draw."""
+    """Resets flags to prepare for the next question draw. Used as an on_click callback."""
     quiz_data = st.session_state[SS_QUIZ_DATA]
     quiz_data[QK_SHOW_ANSWER] = False
     quiz_data[QK_SUBMITTED] = False
     quiz_data[QK_SHOW_ANSWER_CLICKED] = False
     quiz_data[QK_USER_SELECTED_OPTION] = None # Clear user selection
-    quiz_data[QK_CURRENT_OPTIONS_DISPLAY] = None # Clear options display for next question
     quiz_data[QK_LAST_ANSWER_CORRECT] = None # Added: Clear correctness state for next question
-    # Remove the stored current index so a new one is picked
-    if SS_CURRENT_INDEX in st.session_state:
-        del st.session_state[SS_CURRENT_INDEX]
-    st.rerun()  # Rerun to draw and display the next question
+    quiz_data[QK_AVAILABLE].pop() # Drop the finished question; the next one is now last
+    if not quiz_data[QK_AVAILABLE]:
+        # Build the results row once, at the moment the quiz is completed
+        quiz_data[QK_SUMMARY_ROW] = _build_summary_row(quiz_data, len(st.session_state[SS_FLASHCARDS]))
+        # st.rerun() is a no-op inside callbacks, so ask the quiz panel to rerun the whole app
+        quiz_data[QK_FULL_RERUN_PENDING] = True
 
 
 def display_quiz_results():
     """Displays the final quiz results and review sections."""
+    import pandas as pd
     quiz_data = st.session_state[SS_QUIZ_DATA]
     flashcards = st.session_state[SS_FLASHCARDS]
     total_questions = len(flashcards)
@@ -317,8 +603,10 @@ def display_quiz_results():
 
     if quiz_data[QK_INCORRECT_QUESTIONS]:
         st.subheader("Review Incorrect Questions:")
-        incorrect_df = pd.DataFrame(quiz_data[QK_INCORRECT_QUESTIONS])
-        st.dataframe(incorrect_df, use_container_width=True)
+        # The list no longer changes once the quiz is over, so build the table only once
+        if QK_INCORRECT_DF not in quiz_data:
+            quiz_data[QK_INCORRECT_DF] = pd.DataFrame(quiz_data[QK_INCORRECT_QUESTIONS])
+        st.dataframe(quiz_data[QK_INCORRECT_DF], use_container_width=True)
 
     if st.button("Restart Quiz"):
         # Pass flashcards from session state to start_quiz
@@ -328,11 +616,44 @@ def display_quiz_results():
 # --- Results Persistence ---
 
 
-def load_quiz_results() -> List[Dict[str, Any]]:
-    """Loads all past quiz results from the CSV file."""
-    if os.path.exists(RESULTS_FILE):
+def _results_file_key() -> Optional[Tuple[int, int]]:
+    """
+    Returns (mtime_ns, size) of the results file, or None if it does not exist.
+
+    The size is included because saves only append, so it changes on every write
+    even where the filesystem's timestamps are too coarse to tell two writes apart.
+    """
+    try:
+        stat = os.stat(RESULTS_FILE)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+# Only the current file key can ever be hit again, so keep a single entry
+@st.cache_data(show_spinner=False, max_entries=1)
+def _load_results_cached(file_key: Tuple[int, int]) -> List[Dict[str, Any]]:
+    """
+    Reads the results CSV. Cached on the file's (mtime_ns, size) key, so the
+    file is only re-read after it has been written to.
+    """
+    import pandas as pd
+    return pd.read_csv(RESULTS_FILE).to_dict('records')
+
+
+def load_quiz_results(file_key: Optional[Tuple[int, int]] = None) -> List[Dict[str, Any]]:
+    """
+    Loads all past quiz results from the CSV file.
+
+    Args:
+        file_key: The results file key from _results_file_key, if the caller already has it.
+    """
+    import pandas as pd
+    if file_key is None:
+        file_key = _results_file_key()
+    if file_key is not None:
         try:
-            return pd.read_csv(RESULTS_FILE).to_dict('records')
+            return _load_results_cached(file_key)
         except pd.errors.EmptyDataError:
             return []  # File exists but is empty
         except Exception as e:
@@ -341,15 +662,33 @@ def load_quiz_results() -> List[Dict[str, Any]]:
     return []
 
 
-def save_quiz_results(results: List[Dict[str, Any]]):
-    """Saves quiz results to the CSV file."""
+def append_quiz_result(result: Dict[str, Any]):
+    """Appends a single quiz result row to the CSV file, writing the header only for a new file."""
+    import pandas as pd
     try:
-        df = pd.DataFrame(results)
-        df.to_csv(RESULTS_FILE, index=False)
+        header = not os.path.exists(RESULTS_FILE) or os.path.getsize(RESULTS_FILE) == 0
+        pd.DataFrame([result]).to_csv(RESULTS_FILE, mode='a', header=header, index=False)
     except Exception as e:
         st.error(f"Error saving results file: {e}")
 
 
+def _build_summary_row(quiz_data: Dict[str, Any], total_questions: int) -> Dict[str, Any]:
+    """Builds the results file row for a finished quiz."""
+    # Format incorrect questions slightly more compactly for the CSV
+    incorrect_questions_str = "; ".join(
+        f"Q: {item['Question']} | A: {item['Correct Answer']} | Your: {item['Your Answer']}"
+        for item in quiz_data[QK_INCORRECT_QUESTIONS]
+    )
+    return {
+        "Timestamp": datetime.datetime.now().isoformat(),
+        "User": st.session_state.get(SS_USER, "Unknown"),
+        "Correct Count": quiz_data[QK_CORRECT_COUNT],
+        "Incorrect Count": quiz_data[QK_INCORRECT_COUNT],
+        "Total Questions": total_questions,
+        "Incorrect Details": incorrect_questions_str,
+    }
+
+
 def record_quiz_attempt():
     """Records the just-completed quiz attempt to the results file."""
     quiz_data = st.session_state[SS_QUIZ_DATA]
@@ -361,45 +700,130 @@ def record_quiz_attempt():
         st.warning("User name not set. Results cannot be saved.")
         return
 
-    results = load_quiz_results()
-    timestamp = datetime.datetime.now().isoformat()
+    # Normally built when the last question was finished; build it now if it is missing
+    if QK_SUMMARY_ROW not in quiz_data:
+        quiz_data[QK_SUMMARY_ROW] = _build_summary_row(quiz_data, len(flashcards))
 
-    # Format incorrect questions slightly more compactly for the CSV
-    incorrect_details = []
-    for item in quiz_data[QK_INCORRECT_QUESTIONS]:
-        incorrect_details.append(
-            f"Q: {item['Question']} | A: {item['Correct Answer']} | Your: {item['Your Answer']}"
-        )
-    incorrect_questions_str = "; ".join(incorrect_details)
-
-    results.append({
-        "Timestamp": timestamp,
-        "User": user,
-        "Correct Count": quiz_data[QK_CORRECT_COUNT],
-        "Incorrect Count": quiz_data[QK_INCORRECT_COUNT],
-        "Total Questions": len(flashcards),
-        "Incorrect Details": incorrect_questions_str,
-    })
-    save_quiz_results(results)
+    append_quiz_result(quiz_data[QK_SUMMARY_ROW])
     st.success("Quiz results recorded.")
 
 
+@st.cache_data(show_spinner=False, max_entries=1)
+def _results_table_cached(file_key: Tuple[int, int]) -> "pd.DataFrame":
+    """Builds the display table of past results. Cached on the results file's (mtime_ns, size) key."""
+    import pandas as pd
+    df = pd.DataFrame(_load_results_cached(file_key))
+    if "Timestamp" in df.columns:
+        try:
+            # Timestamps are written with isoformat(), so a format hint skips per-value inference
+            df["Timestamp"] = pd.to_datetime(
+                df["Timestamp"], format='ISO8601', cache=True).dt.strftime('%Y-%m-%d %H:%M:%S')
+        except Exception:
+            pass  # Ignore formatting errors
+    return df
+
+
+@st.dialog("All Past Quiz Results", width="large")
 def display_all_quiz_results():
-    """Displays all recorded quiz results in a table."""
-    results = load_quiz_results()
+    """
+    Displays all recorded quiz results in a table inside a modal dialog.
+
+    The dialog runs like a fragment, so it is drawn over the current page
+    instead of being interleaved with the active quiz in the main area.
+    """
+    # Stat the file once so the raw results and the table use the same key
+    file_key = _results_file_key()
+    results = load_quiz_results(file_key)
     if results:
-        st.subheader("All Past Quiz Results")
-        df = pd.DataFrame(results)
-        if "Timestamp" in df.columns:
-            try:
-                df["Timestamp"] = pd.to_datetime(
-                    df["Timestamp"]).dt.strftime('%Y-%m-%d %H:%M:%S')
-            except Exception:
-                pass  # Ignore formatting errors
+        df = _results_table_cached(file_key)
         st.dataframe(df, use_container_width=True)
     else:
         st.info("No past quiz results found.")
 
+# --- Quiz Panel ---
+
+@st.fragment
+def _quiz_panel():
+    """
+    Renders the active quiz: the current question, action buttons and progress.
+
+    Runs as a fragment, so answering questions only reruns this panel instead
+    of the whole script (file upload handling, sidebar, history).
+    """
+    quiz_data = st.session_state[SS_QUIZ_DATA]
+    flashcards = st.session_state[SS_FLASHCARDS]
+
+    # The quiz just finished: the sidebar controls change too, so rerun the whole app once
+    if quiz_data.pop(QK_FULL_RERUN_PENDING, False):
+        st.rerun()
+
+    # --- Active Quiz Logic ---
+    available: List[int] = quiz_data[QK_AVAILABLE]
+
+    if not available:
+        # --- Quiz Completion Display ---
+        display_quiz_results()
+        if 'results_recorded' not in quiz_data:
+            record_quiz_attempt()
+            quiz_data['results_recorded'] = True
+    else:
+        # --- Current Question Index (per-question state is reset by handle_next_question) ---
+        current_card_index = available[-1]
+        current_card = flashcards[current_card_index]
+
+        # --- Display Question UI ---
+        # Display question and get user selection (letter A, B, C, D or None)
+        user_selected_option_letter = display_question(
+            current_card, _question_key_suffix(current_card_index))
+
+        # Update session state with the user's selection
+        quiz_data[QK_USER_SELECTED_OPTION] = user_selected_option_letter
+
+        st.write("---")  # Separator
+
+        # --- Action Buttons (Toggle Logic) ---
+        submitted = quiz_data[QK_SUBMITTED]
+        show_answer_clicked = quiz_data[QK_SHOW_ANSWER_CLICKED]
+
+        if submitted or show_answer_clicked:
+            # --- Display Feedback Persistently ---
+            # Display Correct/Incorrect feedback
+            if quiz_data.get(QK_LAST_ANSWER_CORRECT) is True:
+                st.success("Correct!")
+            elif quiz_data.get(QK_LAST_ANSWER_CORRECT) is False:
+                st.error("Incorrect.")
+
+            # Ensure the answer text is shown
+            if quiz_data[QK_SHOW_ANSWER]:
+                correct_answer_text = current_card['correct_answer_text']
+                st.info(f"**Correct Answer:** {correct_answer_text}")
+
+            # Display Next Question button. Button handlers run as on_click callbacks,
+            # so the fragment rerun that follows a click already reflects the new state.
+            st.button("➡️ Next Question", key=f"next_question_{current_card_index}",
+                      on_click=handle_next_question)
+        else:
+            # Display Submit and Show Answer buttons
+            col_submit, col_show = st.columns(2)
+            with col_submit:
+                submit_disabled = user_selected_option_letter is None
+                st.button("✅ Submit Answer", key=f"submit_answer_{current_card_index}", disabled=submit_disabled,
+                          type="primary", on_click=handle_submit, args=(current_card_index,))
+            with col_show:
+                show_answer_key = f"show_answer_{current_card_index}"
+                st.button("💡 Show Answer",
+                          key=show_answer_key,
+                          help="Reveal the correct answer. Counts as incorrect if used before submitting.",
+                          on_click=handle_show_answer, args=(current_card_index,))
+
+        st.write("---")
+        # --- Progress Indicators ---
+        # The current question stops counting as remaining once it has been answered
+        remaining_count = len(available) - (1 if submitted or show_answer_clicked else 0)
+        st.write(f"**Remaining Questions:** {remaining_count}")
+        st.write(
+            f"**Correct:** {quiz_data[QK_CORRECT_COUNT]} | **Incorrect:** {quiz_data[QK_INCORRECT_COUNT]}")
+
 # --- Main Application ---
 
 def main():
@@ -421,38 +845,7 @@ def main():
 
     # --- Instructions Expander (Moved to Sidebar) ---
     with st.sidebar.expander("ℹ️ How to Use This App", expanded=False):  # Start collapsed
-        st.markdown(
-            f"""
-            **Welcome to the Multiple Choice Quiz App!**
-
-            1.  **Enter Your Name:** Enter your name under "User" above. This is needed to save your quiz results.
-            2.  **Upload Your Quiz File:**
-                *   Under "Load Quiz File" below, click "Browse files".
-                *   Select a **CSV** or **XLSX** (Excel) file.
-                *   **File Structure (by column position):**
-                    *   Your file **must** contain at least 6 columns.
-                    *   The **1st column** should contain the **Question** text.
-                    *   The **2nd, 3rd, 4th, and 5th columns** should contain the text for **Option A, B, C, and D** respectively.
-                    *   The **6th column** should contain the **Correct Answer Letter** ('A', 'B', 'C', or 'D'). Quotation marks around the letter are ignored.
-                    *   The **very first row** of your file should contain **headers** (these are ignored, only the position matters).
-                    *   Any columns beyond the 6th will be ignored.
-            3.  **Start the Quiz:** Once the quiz file is loaded, click the "**🚀 Start Quiz**" button in the main area (right side).
-            4.  **Answer Questions:**
-                *   Read the question displayed in the main area.
-                *   Select your answer from the multiple-choice options.
-                *   Click "**✅ Submit Answer**". You'll get immediate feedback (Correct/Incorrect).
-                *   *(Optional)*: Click "**💡 Show Answer**" if you're stuck (this will mark the question as incorrect if you haven't submitted yet).
-            5.  **Continue:** After submitting or showing the answer, the main button changes to "**➡️ Next Question**". Click it to proceed.
-            6.  **Restarting:**
-                *   **During Quiz:** Use the "**🔁 Restart Quiz Now**" button under "Quiz Controls" below to start over with the same quiz questions at any time.
-                *   **After Quiz:** Once finished, a "**Restart Quiz**" button appears below the results in the main area.
-            7.  **View Results:**
-                *   Your final score and a review of incorrect/correct answers appear automatically when the quiz ends in the main area.
-                *   To see a history of all past attempts, click "**Show All Past Results**" under "History" below.
-
-            **Good luck!** ✨
-            """
-        )
+        st.html(INSTRUCTIONS_HTML)
 
     # --- File Upload ---
     st.sidebar.header("Load Quiz File")
@@ -465,22 +858,29 @@ def main():
     # --- Handle File Upload/Removal ---
     if uploaded_file is not None:
         current_file_name = uploaded_file.name
-        previous_file_name = st.session_state.get(SS_LOADED_FILE_NAME, None)
+        previous_digest = st.session_state.get(SS_LOADED_FILE_DIGEST, None)
+        # Only hash the bytes when the uploader hands over a different file; reruns
+        # with the same upload reuse the stored digest
+        if uploaded_file.file_id == st.session_state.get(SS_LOADED_FILE_ID, None):
+            current_digest = previous_digest
+        else:
+            current_digest = _file_digest(uploaded_file.getvalue())
 
-        # Check if a new file is uploaded or if flashcards are not loaded yet
-        if SS_FLASHCARDS not in st.session_state or current_file_name != previous_file_name:
+        # Check if different file contents are uploaded or if flashcards are not loaded yet.
+        # Comparing content hashes means re-selecting identical bytes never re-parses.
+        if SS_FLASHCARDS not in st.session_state or current_digest != previous_digest:
             st.sidebar.info(f"Loading {current_file_name}...")
             quiz_data_loaded = load_quiz_data_from_file(uploaded_file)
 
             if quiz_data_loaded:
                 st.session_state[SS_FLASHCARDS] = quiz_data_loaded
                 st.session_state[SS_LOADED_FILE_NAME] = current_file_name
+                st.session_state[SS_LOADED_FILE_DIGEST] = current_digest
+                st.session_state[SS_LOADED_FILE_ID] = uploaded_file.file_id
                 st.sidebar.success(f"Loaded {len(quiz_data_loaded)} quiz questions from {current_file_name}.")
                 # Reset quiz state when a new file is loaded successfully
                 st.session_state[SS_QUIZ_DATA] = _get_default_quiz_state()
                 st.session_state[SS_QUIZ_DATA][QK_STARTED] = False
-                if SS_CURRENT_INDEX in st.session_state:
-                    del st.session_state[SS_CURRENT_INDEX]
                 st.rerun() # Rerun to update the UI after loading
             else:
                 # Clear state if loading failed
@@ -488,12 +888,21 @@ def main():
                     del st.session_state[SS_FLASHCARDS]
                 if SS_LOADED_FILE_NAME in st.session_state:
                     del st.session_state[SS_LOADED_FILE_NAME]
+                if SS_LOADED_FILE_DIGEST in st.session_state:
+                    del st.session_state[SS_LOADED_FILE_DIGEST]
+                if SS_LOADED_FILE_ID in st.session_state:
+                    del st.session_state[SS_LOADED_FILE_ID]
+                if SS_LOAD_WARNING in st.session_state:
+                    del st.session_state[SS_LOAD_WARNING]
                 if SS_QUIZ_DATA in st.session_state:
                     del st.session_state[SS_QUIZ_DATA]
-                if SS_CURRENT_INDEX in st.session_state:
-                    del st.session_state[SS_CURRENT_INDEX]
                 # Error message is shown inside load_quiz_data_from_file
                 # st.rerun() # Rerun to clear UI if needed, but error message might be enough
+        else:
+            # Same contents, possibly re-selected under another name: keep the quiz but
+            # track the current upload so the banner shows its name
+            st.session_state[SS_LOADED_FILE_NAME] = current_file_name
+            st.session_state[SS_LOADED_FILE_ID] = uploaded_file.file_id
 
     # Handle case where file is removed
     elif SS_FLASHCARDS in st.session_state:
@@ -501,17 +910,19 @@ def main():
         del st.session_state[SS_FLASHCARDS]
         if SS_LOADED_FILE_NAME in st.session_state:
             del st.session_state[SS_LOADED_FILE_NAME]
+        if SS_LOADED_FILE_DIGEST in st.session_state:
+            del st.session_state[SS_LOADED_FILE_DIGEST]
+        if SS_LOADED_FILE_ID in st.session_state:
+            del st.session_state[SS_LOADED_FILE_ID]
+        if SS_LOAD_WARNING in st.session_state:
+            del st.session_state[SS_LOAD_WARNING]
         if SS_QUIZ_DATA in st.session_state:
             del st.session_state[SS_QUIZ_DATA]
-        if SS_CURRENT_INDEX in st.session_state:
-            del st.session_state[SS_CURRENT_INDEX]
         st.rerun()
 
 
     # --- Process Quiz State ---
     if SS_FLASHCARDS in st.session_state:
-        flashcards = st.session_state[SS_FLASHCARDS]
-
         # Ensure quiz_data is initialized if flashcards are present but quiz_data is not
         if SS_QUIZ_DATA not in st.session_state:
             st.session_state[SS_QUIZ_DATA] = _get_default_quiz_state()
@@ -522,10 +933,7 @@ def main():
         # --- Sidebar Controls (Restart Button) ---
         st.sidebar.header("Quiz Controls")
         if quiz_data.get(QK_STARTED, False):
-            all_indices_set = set(range(len(flashcards)))
-            used_indices_set: Set[int] = quiz_data.get(
-                QK_USED_QUESTIONS, set())
-            is_finished = not (all_indices_set - used_indices_set)
+            is_finished = not quiz_data[QK_AVAILABLE]
             if not is_finished:
                 if st.sidebar.button("🔁 Restart Quiz Now",
                                      key="restart_quiz_sidebar",
@@ -540,6 +948,8 @@ def main():
             # Display file name if loaded
             if SS_LOADED_FILE_NAME in st.session_state:
                  st.info(f"Quiz data loaded from **{st.session_state[SS_LOADED_FILE_NAME]}**. Press 'Start Quiz' to begin.")
+                 if SS_LOAD_WARNING in st.session_state:
+                     st.warning(st.session_state[SS_LOAD_WARNING])
                  if st.button("🚀 Start Quiz", type="primary"):
                     start_quiz(st.session_state[SS_FLASHCARDS])
             else:
@@ -547,82 +957,7 @@ def main():
 
 
         elif quiz_data.get(QK_STARTED, False):
-            # --- Active Quiz Logic ---
-            all_indices = set(range(len(flashcards)))
-            used_indices: Set[int] = quiz_data[QK_USED_QUESTIONS]
-            available_indices = list(all_indices - used_indices)
-
-            if not available_indices:
-                # --- Quiz Completion Display ---
-                display_quiz_results()
-                if 'results_recorded' not in quiz_data:
-                    record_quiz_attempt()
-                    quiz_data['results_recorded'] = True
-            else:
-                # --- Get or Select Current Question Index ---
-                if SS_CURRENT_INDEX not in st.session_state:
-                    st.session_state[SS_CURRENT_INDEX] = random.choice(
-                        available_indices)
-                    # Clear state for the new question
-                    quiz_data[QK_CURRENT_OPTIONS_DISPLAY] = None
-                    quiz_data[QK_USER_SELECTED_OPTION] = None
-                    quiz_data[QK_LAST_ANSWER_CORRECT] = None # Added: Clear correctness state for new question
-
-
-                current_card_index = st.session_state[SS_CURRENT_INDEX]
-                current_card = flashcards[current_card_index]
-
-                # --- Display Question UI ---
-                # Display question and get user selection (letter A, B, C, D or None)
-                user_selected_option_letter = display_question(
-                    current_card, f"q_{current_card_index}")
-
-                # Update session state with the user's selection
-                quiz_data[QK_USER_SELECTED_OPTION] = user_selected_option_letter
-
-                st.write("---")  # Separator
-
-                # --- Action Buttons (Toggle Logic) ---
-                submitted = quiz_data[QK_SUBMITTED]
-                show_answer_clicked = quiz_data[QK_SHOW_ANSWER_CLICKED]
-                action_button_key = f"action_button_{current_card_index}"
-
-                if submitted or show_answer_clicked:
-                    # --- Display Feedback Persistently ---
-                    # Display Correct/Incorrect feedback
-                    if quiz_data.get(QK_LAST_ANSWER_CORRECT) is True:
-                        st.success("Correct!")
-                    elif quiz_data.get(QK_LAST_ANSWER_CORRECT) is False:
-                        st.error("Incorrect.")
-
-                    # Ensure the answer text is shown
-                    if quiz_data[QK_SHOW_ANSWER]:
-                        correct_answer_text = current_card['correct_answer_text']
-                        st.info(f"**Correct Answer:** {correct_answer_text}")
-
-                    # Display Next Question button
-                    if st.button("➡️ Next Question", key=action_button_key):
-                        handle_next_question()
-                else:
-                    # Display Submit and Show Answer buttons
-                    col_submit, col_show = st.columns(2)
-                    with col_submit:
-                        submit_disabled = user_selected_option_letter is None
-                        if st.button("✅ Submit Answer", key=action_button_key, disabled=submit_disabled, type="primary"):
-                            handle_submit(current_card_index)
-                    with col_show:
-                        show_answer_key = f"show_answer_{current_card_index}"
-                        if st.button("💡 Show Answer",
-                                     key=show_answer_key,
-                                     help="Reveal the correct answer. Counts as incorrect if used before submitting."):
-                            handle_show_answer(current_card_index)
-
-                st.write("---")
-                # --- Progress Indicators ---
-                remaining_count = len(available_indices)
-                st.write(f"**Remaining Questions:** {remaining_count}")
-                st.write(
-                    f"**Correct:** {quiz_data[QK_CORRECT_COUNT]} | **Incorrect:** {quiz_data[QK_INCORRECT_COUNT]}")
+            _quiz_panel()
 
     else:
         # No flashcards loaded state (initial state or after file removal)